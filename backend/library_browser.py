@@ -1,8 +1,15 @@
 import os
 import logging
-from typing import List, Dict, Optional, Tuple
+import threading
+import time
+import heapq
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, List, Dict, Optional, Tuple
+from operator import itemgetter
 from pathlib import Path
-import math
+from array import array
+
+from backend.library_index import LibraryIndex
 
 logger = logging.getLogger(__name__)
 
@@ -10,142 +17,590 @@ logger = logging.getLogger(__name__)
 class LibraryBrowser:
     """Browse and manage files in the library path."""
     
-    def __init__(self, library_path: str):
+    # How long a scanned listing is served without re-checking the tree
+    CACHE_TTL_SECONDS = 5.0
+    # Files modified less than this long before the previous scan started may still be
+    # written to (e.g. a copy in progress), so they are re-stat'ed on every revalidation.
+    # Covers coarse filesystem timestamps (FAT, SMB) as well.
+    WRITE_SETTLE_SECONDS = 2.0
+    # Worker threads used to scan directories in parallel
+    SCAN_WORKERS = 8
+    # sort_by names accepted by get_files_paginated -> record field used as the sort key
+    SORT_FIELDS = {
+        'filename': '_name_lower',
+        'size': 'size',
+        'modified': 'modified',
+        'directory': 'directory'
+    }
+    
+    def __init__(self, library_path: str, index_path: Optional[str] = 'library_index.db'):
         self.library_path = library_path
         self.video_extensions = {'.mp4', '.mkv', '.avi', '.mov', '.wmv', '.flv', '.webm', '.m4v', '.mpg', '.mpeg'}
         self.subtitle_extensions = {'.srt', '.sub', '.vtt', '.ass', '.ssa'}
         self.supported_extensions = self.video_extensions | self.subtitle_extensions | {'.mp3', '.flac', '.wav', '.aac', '.m4a', '.pdf', '.epub', '.mobi'}
+        
+        # On POSIX, directories are scanned with bytes paths so only names passing the
+        # extension filter get decoded. Windows is natively UTF-16, so str is cheaper there.
+        self._scan_bytes = os.name == 'posix'
+        self._scan_dot = b'.' if self._scan_bytes else '.'
+        self._scan_extensions = {(ext.encode() if self._scan_bytes else ext): ext for ext in self.supported_extensions}
+        
+        # Recursive listing cache, see _load_listing()
+        self._cache_lock = threading.Lock()
+        self._cache: Optional[List[Dict]] = None
+        self._cache_by_path: Dict[str, Dict] = {}
+        # Column layout of the cached listing for stats: (sizes, is_video flags, is_subtitle flags)
+        self._cache_columns: Tuple[array, bytearray, bytearray] = self._build_columns([])
+        self._cache_key: Optional[Tuple[str, int]] = None
+        self._cache_time = 0.0
+        # Wall-clock start of the last completed scan, see WRITE_SETTLE_SECONDS
+        self._last_scan_started: Optional[float] = None
+        # Per-directory cache: dir path -> (dir mtime_ns, files, subdirectory paths)
+        self._dir_cache: Dict[str, Tuple[int, List[Dict], List[str]]] = {}
+        # Recursive file count per directory, for the folder entries of the directory view
+        self._dir_file_counts: Dict[str, int] = {}
+        # Persistent copy of the per-directory cache, seeded into memory on first scan
+        self._index = LibraryIndex(index_path) if index_path else None
+        self._index_loaded = False
+        # Background re-check of the files served from the index, see _verify_indexed_directories()
+        self._verify_thread: Optional[threading.Thread] = None
     
     def update_library_path(self, new_path: str):
         """Update the library path."""
+        if new_path == self.library_path:
+            return
+        
         self.library_path = new_path
+        self._reset_cache()
         logger.info(f"Library path updated to: {new_path}")
     
-    def _get_all_files(self) -> List[Dict]:
-        """Recursively get all files in the library path."""
+    def invalidate_cache(self):
+        """Drop the cached library listing and its persistent index so the next request rescans."""
+        self._reset_cache()
+        if self._index is not None:
+            self._index.clear(self.library_path)
+    
+    def _reset_cache(self):
+        """Drop the in-memory listing; the index is reloaded (and re-verified) on the next scan."""
+        with self._cache_lock:
+            self._cache = None
+            self._cache_by_path = {}
+            self._cache_columns = self._build_columns([])
+            self._cache_key = None
+            self._cache_time = 0.0
+            self._last_scan_started = None
+            self._dir_cache = {}
+            self._dir_file_counts = {}
+            self._index_loaded = False
+    
+    def _build_file_record(self, filename: str, file_path: str, relative_path: str,
+                           file_ext: str, size: int, modified: float,
+                           directory: Optional[str] = None) -> Dict:
+        """Build the file dictionary served to the library UI."""
+        return {
+            'filename': filename,
+            'full_path': file_path,
+            'relative_path': relative_path,
+            'directory': os.path.dirname(relative_path) if directory is None else directory,
+            'extension': file_ext,
+            'size': size,
+            'modified': modified,
+            'is_video': file_ext in self.video_extensions,
+            'is_subtitle': file_ext in self.subtitle_extensions,
+            # Lowercased once here for sorting/searching; stripped before items are returned
+            '_name_lower': filename.lower(),
+            '_relpath_lower': relative_path.lower()
+        }
+    
+    def _scan_directory(self, path: str, root_prefix: str) -> Tuple[List[Dict], List[str]]:
+        """
+        Scan a single directory (non-recursive).
+        
+        Args:
+            path: Directory to scan
+            root_prefix: Library root with trailing separator, stripped to build relative paths
+            
+        Returns:
+            Tuple of (file records in this directory, subdirectory paths)
+        """
         files = []
+        subdirs = []
+        
+        try:
+            it = os.scandir(os.fsencode(path) if self._scan_bytes else path)
+        except OSError as e:
+            # Match os.walk: skip unreadable directories instead of aborting the scan
+            logger.debug(f"Skipping unreadable directory {path}: {e}")
+            return files, subdirs
+        
+        # This loop runs once per entry in the library: everything that is the same for the
+        # whole directory (path prefixes, relative directory, bound lookups) is computed up front.
+        fsdecode = os.fsdecode
+        scan_dot = self._scan_dot
+        get_extension = self._scan_extensions.get
+        build_record = self._build_file_record
+        add_file = files.append
+        dir_prefix, rel_prefix, directory = self._directory_prefixes(path, root_prefix)
+        
+        with it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(fsdecode(entry.path))
+                    continue
+                
+                name = entry.name
+                dot = name.rfind(scan_dot)
+                
+                # Only include supported file types (skips decoding and stat() for everything else)
+                file_ext = get_extension(name[dot:].lower()) if dot > 0 else None
+                if file_ext is None or not entry.is_file():
+                    continue
+                
+                filename = fsdecode(name)
+                try:
+                    st = entry.stat()
+                except OSError:
+                    # Removed or renamed between listing and stat
+                    continue
+                add_file(build_record(filename, dir_prefix + filename, rel_prefix + filename,
+                                      file_ext, st.st_size, st.st_mtime, directory))
+        
+        self._pair_subtitles(files)
+        return files, subdirs
+    
+    @staticmethod
+    def _directory_prefixes(path: str, root_prefix: str) -> Tuple[str, str, str]:
+        """Return (full path prefix, relative path prefix, relative directory) for files in path."""
+        dir_prefix = os.path.join(path, '')
+        return dir_prefix, dir_prefix[len(root_prefix):], path[len(root_prefix):]
+    
+    def _pair_subtitles(self, files: List[Dict]):
+        """
+        Set 'subtitle_path' and 'has_subtitle' on the video records of one directory.
+        
+        Pairs each video with a subtitle sharing its base name, using the records
+        already scanned instead of looking for subtitles on disk.
+        """
+        subtitles_by_base = {}
+        for f in files:
+            if f['is_subtitle']:
+                subtitles_by_base.setdefault(f['filename'][:-len(f['extension'])], f['full_path'])
+        
+        for f in files:
+            if f['is_video']:
+                subtitle_path = subtitles_by_base.get(f['filename'][:-len(f['extension'])])
+                f['subtitle_path'] = subtitle_path
+                f['has_subtitle'] = subtitle_path is not None
+    
+    def _revalidate_directory(self, path: str, root_prefix: str,
+                              recent_cutoff: Optional[float] = None) -> Optional[Tuple[str, int, List[Dict], List[str]]]:
+        """
+        Return a directory's listing, reusing the cached one if its mtime is unchanged.
+        
+        A file growing in place doesn't change its directory's mtime, so cached files
+        modified at or after recent_cutoff are re-stat'ed.
         
+        Returns:
+            Tuple of (path, dir mtime_ns, file records, subdirectory paths) or None if the directory is gone
+        """
+        try:
+            dir_mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        
+        cached = self._dir_cache.get(path)
+        if cached is not None and cached[0] == dir_mtime:
+            files = cached[1]
+            if recent_cutoff is not None:
+                files = self._restat_recent(files, recent_cutoff)
+            return path, dir_mtime, files, cached[2]
+        
+        dir_files, subdirs = self._scan_directory(path, root_prefix)
+        return path, dir_mtime, dir_files, subdirs
+    
+    def _restat_record(self, record: Dict, st: os.stat_result) -> Dict:
+        """Return a new record for the same file with size/mtime taken from st."""
+        return self._build_file_record(record['filename'], record['full_path'], record['relative_path'],
+                                       record['extension'], st.st_size, st.st_mtime, record['directory'])
+    
+    def _restat_recent(self, files: List[Dict], cutoff: float) -> List[Dict]:
+        """
+        Re-stat the files of one directory modified at or after cutoff.
+        
+        Returns:
+            The given list if nothing changed, otherwise a new list of file records
+        """
+        refreshed = None
+        for i, record in enumerate(files):
+            if record['modified'] < cutoff:
+                continue
+            try:
+                st = os.stat(record['full_path'])
+            except OSError:
+                # A removal changes the directory mtime, so the next revalidation drops it
+                continue
+            if st.st_size != record['size'] or st.st_mtime != record['modified']:
+                if refreshed is None:
+                    refreshed = list(files)
+                refreshed[i] = self._restat_record(record, st)
+        
+        if refreshed is None:
+            return files
+        self._pair_subtitles(refreshed)
+        return refreshed
+    
+    def _verify_directory(self, path: str, files: List[Dict]) -> List[Dict]:
+        """
+        Re-check files of a directory whose own mtime is unchanged.
+        
+        Files rewritten or still growing in place don't touch the directory mtime, so
+        entries whose size or mtime differ from the stored record are re-stat'ed.
+        
+        Returns:
+            The given list if nothing changed, otherwise a new list of file records
+        """
+        by_name = {f['filename']: f for f in files}
+        verified = []
+        changed = False
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    record = by_name.get(entry.name)
+                    if record is None:
+                        continue
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    if st.st_size != record['size'] or st.st_mtime != record['modified']:
+                        record = self._restat_record(record, st)
+                        changed = True
+                    verified.append(record)
+        except OSError:
+            return files
+        
+        if not changed and len(verified) == len(files):
+            return files
+        self._pair_subtitles(verified)
+        return verified
+    
+    @staticmethod
+    def _build_columns(files: List[Dict]) -> Tuple[array, bytearray, bytearray]:
+        """Build parallel size/flag columns so library stats reduce in C instead of per-dict."""
+        return (
+            array('q', [f['size'] for f in files]),
+            bytearray(f['is_video'] for f in files),
+            bytearray(f['is_subtitle'] for f in files)
+        )
+    
+    @staticmethod
+    def _get_library_stats(columns: Tuple[array, bytearray, bytearray]) -> Dict:
+        """Get file count, type counts and total size from the listing's stats columns."""
+        sizes, is_video, is_subtitle = columns
+        return {
+            'total_files': len(sizes),
+            'video_files': is_video.count(1),
+            'subtitle_files': is_subtitle.count(1),
+            'total_size': sum(sizes)
+        }
+    
+    def _load_listing(self) -> Tuple[List[Dict], Tuple[array, bytearray, bytearray]]:
+        """
+        Return the cached recursive listing and its stats columns, rescanning if stale.
+        
+        The returned list is shared with the cache and must not be modified.
+        
+        The listing is cached. Within CACHE_TTL_SECONDS it is reused as long as the
+        library root's mtime is unchanged; after that, the tree is revalidated one
+        directory at a time and only directories whose mtime changed are rescanned.
+        The per-directory cache is also persisted in the library index, so after a
+        restart only directories changed since the last run are rescanned. Files
+        served from the index may have changed in place (which doesn't touch the
+        directory mtime), so they are re-stat'ed once in the background, see
+        _verify_indexed_directories(). During a run, files still being written
+        are re-stat'ed while they are recent (see WRITE_SETTLE_SECONDS); a later
+        rewrite of an older file may lag until the cache is invalidated.
+        """
         if not os.path.exists(self.library_path):
             logger.warning(f"Library path does not exist: {self.library_path}")
-            return files
+            return [], self._build_columns([])
         
         try:
-            for root, dirs, filenames in os.walk(self.library_path):
-                for filename in filenames:
-                    file_path = os.path.join(root, filename)
-                    file_ext = os.path.splitext(filename)[1].lower()
-                    
-                    # Only include supported file types
-                    if file_ext in self.supported_extensions:
-                        relative_path = os.path.relpath(file_path, self.library_path)
-                        file_size = os.path.getsize(file_path)
-                        modified_time = os.path.getmtime(file_path)
+            with self._cache_lock:
+                key = (self.library_path, os.stat(self.library_path).st_mtime_ns)
+                if (self._cache is not None and key == self._cache_key
+                        and time.monotonic() - self._cache_time < self.CACHE_TTL_SECONDS):
+                    return self._cache, self._cache_columns
+                
+                seeded_from_index = False
+                if self._index is not None and not self._index_loaded:
+                    self._dir_cache = self._load_index()
+                    self._index_loaded = True
+                    seeded_from_index = bool(self._dir_cache)
+                
+                root_prefix = os.path.join(self.library_path, '')
+                scan_started = time.time()
+                recent_cutoff = None
+                if self._last_scan_started is not None:
+                    recent_cutoff = self._last_scan_started - self.WRITE_SETTLE_SECONDS
+                dir_cache = {}
+                pending = [self.library_path]
+                in_flight = set()
+                
+                # Directories are scanned concurrently: os.scandir/DirEntry.stat release
+                # the GIL, so on slow or network mounts the syscall latency overlaps.
+                with ThreadPoolExecutor(max_workers=self.SCAN_WORKERS) as executor:
+                    while pending or in_flight:
+                        # Bound the number of queued directories to keep memory flat on huge trees
+                        while pending and len(in_flight) < self.SCAN_WORKERS * 4:
+                            in_flight.add(executor.submit(self._revalidate_directory, pending.pop(),
+                                                         root_prefix, recent_cutoff))
                         
-                        files.append({
-                            'filename': filename,
-                            'full_path': file_path,
-                            'relative_path': relative_path,
-                            'directory': os.path.dirname(relative_path),
-                            'extension': file_ext,
-                            'size': file_size,
-                            'modified': modified_time,
-                            'is_video': file_ext in self.video_extensions,
-                            'is_subtitle': file_ext in self.subtitle_extensions
-                        })
+                        done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            result = future.result()
+                            if result is None:
+                                continue
+                            path, dir_mtime, dir_files, subdirs = result
+                            dir_cache[path] = (dir_mtime, dir_files, subdirs)
+                            pending.extend(subdirs)
+                
+                unverified = {}
+                if self._index is not None:
+                    changed = {}
+                    for path, entry in dir_cache.items():
+                        previous = self._dir_cache.get(path)
+                        if previous is None or previous[1] is not entry[1]:
+                            changed[path] = entry
+                        elif seeded_from_index:
+                            unverified[path] = entry[1]
+                    removed = [path for path in self._dir_cache if path not in dir_cache]
+                    self._write_index(changed, removed)
+                
+                self._dir_cache = dir_cache
+                self._publish_listing()
+                self._cache_key = key
+                self._cache_time = time.monotonic()
+                self._last_scan_started = scan_started
+                
+                if unverified:
+                    self._verify_thread = threading.Thread(target=self._verify_indexed_directories,
+                                                           args=(unverified,), name='library-index-verify',
+                                                           daemon=True)
+                    self._verify_thread.start()
+                return self._cache, self._cache_columns
         
         except Exception as e:
             logger.error(f"Error scanning library path: {type(e).__name__}: {e}", exc_info=True)
+            return [], self._build_columns([])
+    
+    def _publish_listing(self):
+        """Rebuild the recursive listing from the per-directory cache. Caller holds _cache_lock."""
+        # Workers finish in arbitrary order; join directories in path order so the
+        # listing (and the order of equal sort keys across pages) is stable between scans
+        files = []
+        for path in sorted(self._dir_cache):
+            files.extend(self._dir_cache[path][1])
+        
+        # Descendants sort after their ancestors, so in reverse order every
+        # subdirectory's count is final before its parent adds it up
+        counts = {}
+        for path in sorted(self._dir_cache, reverse=True):
+            _, dir_files, subdirs = self._dir_cache[path]
+            counts[path] = len(dir_files) + sum(counts.get(sub, 0) for sub in subdirs)
+        
+        self._cache = files
+        self._cache_by_path = {f['full_path']: f for f in files}
+        self._cache_columns = self._build_columns(files)
+        self._dir_file_counts = counts
+    
+    def _verify_indexed_directories(self, directories: Dict[str, List[Dict]]):
+        """
+        Re-stat the files of directories served from the index, off the request path.
+        
+        Directories rescanned or dropped since the listing was built are left alone.
+        
+        Args:
+            directories: Dictionary of dir path -> file records loaded from the index
+        """
+        verified = {path: self._verify_directory(path, files) for path, files in directories.items()}
+        
+        changed = {}
+        with self._cache_lock:
+            for path, files in verified.items():
+                cached = self._dir_cache.get(path)
+                if files is directories[path] or cached is None or cached[1] is not directories[path]:
+                    continue
+                changed[path] = (cached[0], files, cached[2])
+            if not changed:
+                return
+            self._dir_cache.update(changed)
+            self._publish_listing()
         
-        return files
+        logger.info(f"Refreshed {len(changed)} indexed directories with files changed in place")
+        if self._index is not None:
+            self._write_index(changed, [])
+    
+    def _write_index(self, changed: Dict[str, Tuple[int, List[Dict], List[str]]], removed: List[str]):
+        """Persist directory changes to the index; a failed write never discards the scan."""
+        try:
+            self._index.update(self.library_path, changed, removed)
+        except Exception as e:
+            logger.warning(f"Error updating library index: {type(e).__name__}: {e}")
+    
+    def _load_index(self) -> Dict[str, Tuple[int, List[Dict], List[str]]]:
+        """Rebuild the per-directory cache from the persistent index."""
+        root_prefix = os.path.join(self.library_path, '')
+        build_record = self._build_file_record
+        dir_cache = {}
+        for path, (dir_mtime, rows, subdirs) in self._index.load(self.library_path).items():
+            dir_prefix, rel_prefix, directory = self._directory_prefixes(path, root_prefix)
+            files = [build_record(filename, dir_prefix + filename, rel_prefix + filename,
+                                  file_ext, size, modified, directory)
+                     for filename, file_ext, size, modified in rows]
+            self._pair_subtitles(files)
+            dir_cache[path] = (dir_mtime, files, subdirs)
+        return dir_cache
+    
+    def _update_cache_after_rename(self, renamed_files: List[Dict]):
+        """Patch cached records for renamed files instead of rescanning the library."""
+        with self._cache_lock:
+            if self._cache is None:
+                return
+            
+            touched = set()
+            affected_dirs = set()
+            for renamed in renamed_files:
+                touched.add(renamed['old'])
+                touched.add(renamed['new'])
+                affected_dirs.add(os.path.dirname(renamed['old']))
+                affected_dirs.add(os.path.dirname(renamed['new']))
+            
+            by_dir = {}
+            for dir_path in affected_dirs:
+                entry = self._dir_cache.get(dir_path)
+                if entry is not None:
+                    by_dir[dir_path] = [f for f in entry[1] if f['full_path'] not in touched]
+            
+            for renamed in renamed_files:
+                new_path = renamed['new']
+                filename = os.path.basename(new_path)
+                file_ext = os.path.splitext(filename)[1].lower()
+                if file_ext not in self.supported_extensions:
+                    continue
+                try:
+                    st = os.stat(new_path)
+                except OSError:
+                    continue
+                relative_path = os.path.relpath(new_path, self.library_path)
+                if relative_path.startswith(os.pardir):
+                    continue
+                by_dir.setdefault(os.path.dirname(new_path), []).append(
+                    self._build_file_record(filename, new_path, relative_path, file_ext, st.st_size, st.st_mtime))
+            
+            # Re-pair videos and subtitles in the directories touched by the rename. Their
+            # mtime changed with the rename; storing -1 makes the next revalidation rescan them.
+            for dir_path, files in by_dir.items():
+                self._pair_subtitles(files)
+                entry = self._dir_cache.get(dir_path)
+                self._dir_cache[dir_path] = (-1, files, entry[2] if entry is not None else [])
+            self._publish_listing()
     
     def _get_directory_contents(self, current_dir: str) -> Tuple[List[Dict], List[Dict]]:
         """
         Get folders and files in a specific directory (non-recursive).
         
+        Served from the per-directory cache filled by _load_listing(), so the caller
+        must load the listing first.
+        
         Args:
             current_dir: Relative path from library root (empty string for root)
             
         Returns:
-            Tuple of (folders_list, files_list)
+            Tuple of (folders_list, files_list); files_list is a new list of shared cached records
         """
         folders = []
-        files = []
         
         # Build full path
         if current_dir:
-            full_path = os.path.join(self.library_path, current_dir)
+            full_path = os.path.join(self.library_path, os.path.normpath(current_dir))
         else:
             full_path = self.library_path
         
-        if not os.path.exists(full_path):
-            logger.warning(f"Directory does not exist: {full_path}")
-            return folders, files
+        with self._cache_lock:
+            entry = self._dir_cache.get(full_path)
+            counts = self._dir_file_counts
         
-        try:
-            # Get immediate children only
-            items = os.listdir(full_path)
-            
-            for item in items:
-                item_path = os.path.join(full_path, item)
-                
-                if os.path.isdir(item_path):
-                    # It's a folder
-                    folder_rel_path = os.path.join(current_dir, item) if current_dir else item
-                    
-                    # Count files in this folder (recursively)
-                    file_count = 0
-                    try:
-                        for root, dirs, filenames in os.walk(item_path):
-                            file_count += len([f for f in filenames if os.path.splitext(f)[1].lower() in self.supported_extensions])
-                    except:
-                        pass
-                    
-                    folders.append({
-                        'name': item,
-                        'relative_path': folder_rel_path,
-                        'full_path': item_path,
-                        'file_count': file_count,
-                        'is_folder': True
-                    })
-                
-                elif os.path.isfile(item_path):
-                    # It's a file
-                    file_ext = os.path.splitext(item)[1].lower()
-                    
-                    # Only include supported file types
-                    if file_ext in self.supported_extensions:
-                        file_rel_path = os.path.join(current_dir, item) if current_dir else item
-                        file_size = os.path.getsize(item_path)
-                        modified_time = os.path.getmtime(item_path)
-                        is_video = file_ext in self.video_extensions
-                        
-                        # Check for subtitle if it's a video
-                        has_subtitle = False
-                        if is_video:
-                            subtitle_path = self.find_related_subtitle(item_path)
-                            has_subtitle = subtitle_path is not None
-                        
-                        files.append({
-                            'filename': item,
-                            'full_path': item_path,
-                            'relative_path': file_rel_path,
-                            'directory': current_dir,
-                            'extension': file_ext,
-                            'size': file_size,
-                            'modified': modified_time,
-                            'is_video': is_video,
-                            'is_subtitle': file_ext in self.subtitle_extensions,
-                            'has_subtitle': has_subtitle,
-                            'is_folder': False
-                        })
+        if entry is None:
+            logger.warning(f"Directory does not exist: {full_path}")
+            return folders, []
         
-        except Exception as e:
-            logger.error(f"Error scanning directory: {type(e).__name__}: {e}", exc_info=True)
+        root_prefix = os.path.join(self.library_path, '')
+        for sub in entry[2]:
+            folders.append({
+                'name': os.path.basename(sub),
+                'relative_path': sub[len(root_prefix):],
+                'full_path': sub,
+                'file_count': counts.get(sub, 0),
+                'is_folder': True
+            })
         
         # Sort folders alphabetically
         folders.sort(key=lambda x: x['name'].lower())
         
-        return folders, files
+        return folders, list(entry[1])
+    
+    @staticmethod
+    def _compile_search(search: str) -> Callable[[Dict], bool]:
+        """
+        Build a match predicate for a search string.
+        
+        The search is split into lowercase terms; a file matches when every term occurs
+        in its relative path (which ends with the filename, so filename matches are
+        covered too). Single-term searches get a dedicated predicate without the
+        per-term loop.
+        """
+        terms = search.lower().split()
+        if not terms:
+            return lambda f: True
+        if len(terms) == 1:
+            term = terms[0]
+            return lambda f: term in f['_relpath_lower']
+        # Longer terms are usually more selective, so checking them first rejects sooner
+        terms.sort(key=len, reverse=True)
+        return lambda f: all(term in f['_relpath_lower'] for term in terms)
+    
+    @staticmethod
+    def _public_record(item: Dict) -> Dict:
+        """Copy of a listing record without internal (underscore-prefixed) fields."""
+        return {k: v for k, v in item.items() if not k.startswith('_')}
+    
+    @staticmethod
+    def _top_sorted(items: List[Dict], count: int, sort_fields: List[str], reverse: bool) -> List[Dict]:
+        """
+        Return the first `count` items of `items` sorted by `sort_fields` (in priority order).
+        
+        For a single field, uses a heap-based partial sort when only a small prefix is
+        needed (e.g. the first page of a large listing); heapq.nsmallest/nlargest give the
+        same, stable ordering as sorted(...)[:count]. Multiple fields are sorted with one
+        stable single-field pass per field, last field first, which avoids building a
+        tuple key per item.
+        """
+        if count <= 0:
+            return []
+        if len(sort_fields) > 1:
+            for field in reversed(sort_fields):
+                items.sort(key=itemgetter(field), reverse=reverse)
+            return items
+        
+        key = itemgetter(sort_fields[0])
+        if count < len(items) // 2:
+            if reverse:
+                return heapq.nlargest(count, items, key=key)
+            return heapq.nsmallest(count, items, key=key)
+        
+        items.sort(key=key, reverse=reverse)
+        return items
     
     def get_files_paginated(self, page: int = 1, per_page: int = 50, search: Optional[str] = None, 
                            sort_by: str = 'modified', sort_order: str = 'desc', 
@@ -156,53 +611,82 @@ class LibraryBrowser:
         Args:
             page: Page number (1-indexed)
             per_page: Number of items per page
-            search: Optional search filter
-            sort_by: Field to sort by (filename, modified, size)
+            search: Optional search filter; space-separated terms must all match
+            sort_by: Field to sort by (filename, modified, size, directory); comma-separated
+                     fields sort by each in turn, e.g. 'directory,modified'
             sort_order: Sort order (asc, desc)
             current_dir: Current directory relative to library root (empty for root)
             
         Returns:
             Dictionary with folders, files, pagination info, and stats
         """
-        # If searching, use recursive search across all files
-        if search:
-            all_files = self._get_all_files()
-            search_lower = search.lower()
-            all_files = [f for f in all_files if search_lower in f['filename'].lower() 
-                        or search_lower in f['relative_path'].lower()]
+        # One snapshot of the recursive listing serves both search and stats
+        listing, columns = self._load_listing()
+        
+        reverse = (sort_order == 'desc')
+        # Unknown fields fall back to sorting by modified time
+        sort_fields = [self.SORT_FIELDS.get(name.strip(), 'modified') for name in sort_by.split(',')]
+        
+        # If searching, use recursive search across all files. A search without any
+        # terms (e.g. only spaces) browses the directory instead of matching everything.
+        searching = bool(search and search.split())
+        if searching:
+            is_match = self._compile_search(search)
             folders = []
+            match_count = 0
+            
+            def _matches():
+                nonlocal match_count
+                for f in listing:
+                    if is_match(f):
+                        match_count += 1
+                        yield f
+            
+            needed = max(page, 1) * per_page
+            if needed * 2 <= len(listing) and len(sort_fields) == 1:
+                # Early page: stream matches into a bounded heap instead of building the filtered list.
+                # A page beyond the last one only clamps downwards, so this prefix always suffices.
+                sort_key = itemgetter(sort_fields[0])
+                if reverse:
+                    all_files = heapq.nlargest(needed, _matches(), key=sort_key)
+                else:
+                    all_files = heapq.nsmallest(needed, _matches(), key=sort_key)
+            else:
+                all_files = list(_matches())
+            total_files = match_count
         else:
             # Get directory contents (non-recursive)
             folders, all_files = self._get_directory_contents(current_dir)
-        
-        # Sort files
-        reverse = (sort_order == 'desc')
-        if sort_by == 'filename':
-            all_files.sort(key=lambda x: x['filename'].lower(), reverse=reverse)
-        elif sort_by == 'size':
-            all_files.sort(key=lambda x: x['size'], reverse=reverse)
-        else:  # modified
-            all_files.sort(key=lambda x: x['modified'], reverse=reverse)
-        
-        # Combine folders and files for pagination
-        all_items = folders + all_files
+            total_files = len(all_files)
         
         # Calculate pagination
-        total_items = len(all_items)
-        total_pages = math.ceil(total_items / per_page) if total_items > 0 else 1
+        total_items = len(folders) + total_files
+        total_pages = -(-total_items // per_page) if total_items > 0 else 1
         page = max(1, min(page, total_pages))  # Clamp page to valid range
         
         start_idx = (page - 1) * per_page
         end_idx = start_idx + per_page
-        page_items = all_items[start_idx:end_idx]
+        
+        # Sort files (folders always come first, so only the files reaching this page matter)
+        all_files = self._top_sorted(all_files, end_idx - len(folders), sort_fields, reverse)
+        
+        # Combine folders and files for pagination
+        all_items = folders + all_files
+        page_items = [self._public_record(item) for item in all_items[start_idx:end_idx]]
+        if not searching:
+            # Directory view rows carry the folder flag, and every file a subtitle flag
+            for item in page_items:
+                if 'is_folder' not in item:
+                    item['is_folder'] = False
+                    item.setdefault('has_subtitle', False)
         
         # Calculate parent directory
         parent_dir = None
         if current_dir:
             parent_dir = os.path.dirname(current_dir)
         
-        # Get all files recursively for stats
-        all_files_recursive = self._get_all_files()
+        # Stats cover the whole library, not just the current directory
+        stats = self._get_library_stats(columns)
         
         return {
             'items': page_items,
@@ -217,23 +701,23 @@ class LibraryBrowser:
                 'has_previous': page > 1,
                 'has_next': page < total_pages
             },
-            'stats': {
-                'total_files': len(all_files_recursive),
-                'video_files': len([f for f in all_files_recursive if f.get('is_video')]),
-                'subtitle_files': len([f for f in all_files_recursive if f.get('is_subtitle')]),
-                'total_size': sum(f.get('size', 0) for f in all_files_recursive)
-            }
+            'stats': stats
         }
     
     def find_related_subtitle(self, video_path: str) -> Optional[str]:
         """Find subtitle file with matching base name."""
         video_dir = os.path.dirname(video_path)
-        video_base = os.path.splitext(os.path.basename(video_path))[0]
+        prefix = os.path.splitext(os.path.basename(video_path))[0] + '.'
         
-        for ext in self.subtitle_extensions:
-            subtitle_path = os.path.join(video_dir, video_base + ext)
-            if os.path.exists(subtitle_path):
-                return subtitle_path
+        # One directory read instead of an exists() check per subtitle extension
+        try:
+            with os.scandir(video_dir or os.curdir) as it:
+                for entry in it:
+                    name = entry.name
+                    if name.startswith(prefix) and '.' + name[len(prefix):].lower() in self.subtitle_extensions:
+                        return os.path.join(video_dir, name)
+        except OSError:
+            pass
         
         return None
     
@@ -333,6 +817,8 @@ class LibraryBrowser:
                     except Exception as e:
                         logger.warning(f"Failed to rename subtitle: {e}")
             
+            self._update_cache_after_rename(result['renamed_files'])
+            
             result['success'] = True
             result['message'] = f"Successfully renamed {len(result['renamed_files'])} file(s)"
             
@@ -342,26 +828,36 @@ class LibraryBrowser:
         
         return result
     
+    def _directory_unchanged(self, dir_path: str) -> bool:
+        """Whether a directory's mtime still matches the one it was last scanned with."""
+        cached = self._dir_cache.get(dir_path)
+        if cached is None:
+            return False
+        try:
+            return os.stat(dir_path).st_mtime_ns == cached[0]
+        except OSError:
+            return False
+    
     def get_file_info(self, file_path: str) -> Optional[Dict]:
         """Get detailed information about a specific file."""
-        if not os.path.exists(file_path):
+        try:
+            st = os.stat(file_path)
+        except OSError:
             return None
         
+        # Reuse the cached listing record while it still matches the file. Its subtitle
+        # pairing is current as long as the directory is unchanged since it was scanned.
+        record = self._cache_by_path.get(file_path)
+        if record is not None and record['size'] == st.st_size and record['modified'] == st.st_mtime:
+            if not record['is_video'] or self._directory_unchanged(os.path.dirname(file_path)):
+                return self._public_record(record)
+        
         filename = os.path.basename(file_path)
         file_ext = os.path.splitext(filename)[1].lower()
         relative_path = os.path.relpath(file_path, self.library_path)
         
-        info = {
-            'filename': filename,
-            'full_path': file_path,
-            'relative_path': relative_path,
-            'directory': os.path.dirname(relative_path),
-            'extension': file_ext,
-            'size': os.path.getsize(file_path),
-            'modified': os.path.getmtime(file_path),
-            'is_video': file_ext in self.video_extensions,
-            'is_subtitle': file_ext in self.subtitle_extensions
-        }
+        info = self._public_record(self._build_file_record(filename, file_path, relative_path, file_ext,
+                                                           st.st_size, st.st_mtime))
         
         # Check for related subtitle if it's a video
         if info['is_video']:
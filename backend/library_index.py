@@ -0,0 +1,141 @@
+import os
+import marshal
+import sqlite3
+import logging
+from typing import Dict, List, Tuple
+
+from backend.sqlite_store import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+
+class LibraryIndex(SQLiteStore):
+    """
+    Persistent SQLite index of the library listing.
+
+    Stores each scanned directory with its mtime and the supported files it contains,
+    so a restart only needs to rescan directories whose mtime changed since the last run.
+
+    A directory is one row: its subdirectories and (filename, ext, size, mtime) file rows
+    are packed with marshal, which loads far faster than one SQL row per file. Paths and
+    names are stored as os.fsencode() bytes, since names that aren't valid UTF-8 are
+    decoded with surrogate escapes on POSIX and such strings can't be bound as TEXT.
+    The index keeps a single library root; loading a root drops the rows of any other.
+    """
+
+    DESCRIPTION = 'library index'
+    SCHEMA_VERSION = 2
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS directories (
+            root BLOB NOT NULL,
+            path BLOB NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            subdirs BLOB NOT NULL,
+            files BLOB NOT NULL,
+            PRIMARY KEY (root, path)
+        );
+    """
+
+    def __init__(self, db_path: str = 'library_index.db'):
+        super().__init__(db_path)
+
+    def load(self, root: str) -> Dict[str, Tuple[int, List[Tuple[str, str, int, float]], List[str]]]:
+        """
+        Load the stored listing for a library root.
+
+        Args:
+            root: Library root path
+
+        Returns:
+            Dictionary of dir path -> (dir mtime_ns, file rows, subdirectory paths), where each
+            file row is (filename, ext, size, mtime). Empty on error.
+        """
+        with self._lock:
+            try:
+                root_key = os.fsencode(root)
+                conn = self._connect()
+                try:
+                    with conn:
+                        conn.execute('DELETE FROM directories WHERE root != ?', (root_key,))
+                    directories = conn.execute(
+                        'SELECT path, mtime_ns, subdirs, files FROM directories WHERE root = ?', (root_key,)
+                    ).fetchall()
+                finally:
+                    conn.close()
+            except (sqlite3.Error, ValueError) as e:
+                logger.warning(f"Error reading library index: {e}, starting with an empty index")
+                return {}
+
+        fsdecode = os.fsdecode
+        listing = {}
+        file_count = 0
+        for path, mtime_ns, subdirs, files in directories:
+            try:
+                subdirs = [fsdecode(s) for s in marshal.loads(subdirs)]
+                files = [(fsdecode(name), ext, size, mtime) for name, ext, size, mtime in marshal.loads(files)]
+            except (ValueError, EOFError, TypeError):
+                # Unreadable row (e.g. written by another Python version); the directory is rescanned
+                continue
+            listing[fsdecode(path)] = (mtime_ns, files, subdirs)
+            file_count += len(files)
+
+        logger.info(f"Loaded library index for {root}: {len(listing)} directories, {file_count} files")
+        return listing
+
+    def update(self, root: str, changed: Dict[str, Tuple[int, List[Dict], List[str]]],
+               removed: List[str]):
+        """
+        Replace the stored contents of changed directories and drop removed ones.
+
+        Args:
+            root: Library root path
+            changed: Dictionary of dir path -> (dir mtime_ns, file records, subdirectory paths) for rescanned directories
+            removed: Directory paths that no longer exist
+        """
+        if not changed and not removed:
+            return
+
+        fsencode = os.fsencode
+        with self._lock:
+            try:
+                root_key = fsencode(root)
+                rows = [
+                    (root_key, fsencode(path), mtime_ns,
+                     marshal.dumps([fsencode(s) for s in subdirs]),
+                     marshal.dumps([(fsencode(f['filename']), f['extension'], f['size'], f['modified'])
+                                    for f in files]))
+                    for path, (mtime_ns, files, subdirs) in changed.items()
+                ]
+                conn = self._connect()
+                try:
+                    with conn:
+                        conn.executemany('DELETE FROM directories WHERE root = ? AND path = ?',
+                                         [(root_key, fsencode(path)) for path in removed])
+                        conn.executemany(
+                            'INSERT OR REPLACE INTO directories (root, path, mtime_ns, subdirs, files) '
+                            'VALUES (?, ?, ?, ?, ?)',
+                            rows
+                        )
+                finally:
+                    conn.close()
+            except (sqlite3.Error, ValueError) as e:
+                logger.warning(f"Error updating library index: {e}")
+
+    def clear(self, root: str):
+        """
+        Drop the stored listing for a library root so the next scan starts from scratch.
+
+        Args:
+            root: Library root path
+        """
+        with self._lock:
+            try:
+                conn = self._connect()
+                try:
+                    with conn:
+                        conn.execute('DELETE FROM directories WHERE root = ?', (os.fsencode(root),))
+                finally:
+                    conn.close()
+            except (sqlite3.Error, ValueError) as e:
+                logger.warning(f"Error clearing library index: {e}")
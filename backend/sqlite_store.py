@@ -0,0 +1,52 @@
+import sqlite3
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SQLiteStore:
+    """
+    Base class for the small SQLite files the app keeps (library index, TMDB cache).
+
+    Each operation opens its own short-lived connection, serialized by a per-instance lock,
+    and the schema is created in WAL mode when the store is constructed.
+    """
+
+    # Executed on startup with executescript(); statements must be idempotent
+    SCHEMA = ""
+    # Bump when SCHEMA changes incompatibly. Tables written by another version are dropped,
+    # so this is only suitable for stores that are caches of data kept elsewhere.
+    SCHEMA_VERSION = 0
+    # Name used in log messages
+    DESCRIPTION = 'database'
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        self._ensure_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def _ensure_schema(self):
+        """Create the database and tables if they don't exist."""
+        with self._lock:
+            try:
+                conn = self._connect()
+                try:
+                    conn.execute('PRAGMA journal_mode=WAL')
+                    version = conn.execute('PRAGMA user_version').fetchone()[0]
+                    if version != self.SCHEMA_VERSION:
+                        tables = conn.execute(
+                            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+                        ).fetchall()
+                        for (name,) in tables:
+                            conn.execute(f'DROP TABLE IF EXISTS "{name}"')
+                        conn.execute(f'PRAGMA user_version = {int(self.SCHEMA_VERSION)}')
+                    conn.executescript(self.SCHEMA)
+                    conn.commit()
+                finally:
+                    conn.close()
+            except sqlite3.Error as e:
+                logger.warning(f"Error initializing {self.DESCRIPTION} at {self.db_path}: {e}")
@@ -3,27 +3,121 @@ TMDB API integration for movie and TV show information lookup.
 Provides functions to search for movies, TV shows, and retrieve detailed episode information.
 """
 
+import json
 import logging
+import threading
+import time
 import requests
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+from urllib3.util.retry import Retry
+
+from backend.tmdb_cache import TMDBResponseCache
+
+# orjson is optional; it decodes the larger season payloads several times faster than json
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
 
 logger = logging.getLogger(__name__)
 
+# Sentinel distinguishing "not cached" from a cached "not found" (None) result
+_MISS = object()
+
+
+class _LRUCache:
+    """Small thread-safe LRU cache for TMDB lookups."""
+    
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        """Return the cached value for key, or _MISS."""
+        with self._lock:
+            if key not in self._data:
+                return _MISS
+            self._data.move_to_end(key)
+            return self._data[key]
+    
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
 
 class TMDBClient:
     """Client for interacting with The Movie Database (TMDB) API."""
     
     BASE_URL = 'https://api.themoviedb.org/3'
+    # Concurrent requests issued by batch_search (matches the connection pool size)
+    BATCH_WORKERS = 8
+    # Number of search/season results kept in memory; TMDB data rarely changes within a session
+    CACHE_SIZE = 1024
+    # Responses younger than this are served from the disk cache without contacting TMDB;
+    # older ones are revalidated with a conditional GET
+    RESPONSE_CACHE_MAX_AGE_SECONDS = 7 * 24 * 3600
     
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, cache_path: Optional[str] = 'tmdb_cache.db'):
         """
         Initialize TMDB client with API key.
         
         Args:
-            api_key: TMDB API key (v3 API key)
+            api_key: TMDB API key (v3 API key) or v4 API read access token
+            cache_path: SQLite file for the persistent response cache, or None to disable it
         """
         self.api_key = api_key
         self.headers = {'accept': 'application/json'}
+        
+        # v4 read access tokens are JWTs and go in the Authorization header, which keeps
+        # request URLs free of credentials; v3 keys must still be sent as a query param.
+        self._use_bearer = api_key.startswith('eyJ')
+        if self._use_bearer:
+            self.headers['Authorization'] = f'Bearer {api_key}'
+        
+        # Reuse keep-alive connections across requests and retry transient failures/rate limits
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        retry = Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=[429, 500, 502, 503, 504]
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.BATCH_WORKERS, max_retries=retry)
+        self.session.mount('https://', adapter)
+        
+        self._cache = _LRUCache(self.CACHE_SIZE)
+        self._response_cache = TMDBResponseCache(cache_path) if cache_path else None
+    
+    def _cached(self, key) -> object:
+        """
+        Look up a cached result.
+        
+        Returns:
+            A copy of the cached result (callers may modify it), None for a cached miss, or _MISS
+        """
+        cached = self._cache.get(key)
+        if cached is _MISS or cached is None:
+            return cached
+        logger.debug(f"TMDB cache hit: {key}")
+        return dict(cached)
+    
+    @staticmethod
+    def _is_transient_error(error: requests.exceptions.RequestException) -> bool:
+        """Whether a failed request may be answered with a stale cached response (network/server errors only)."""
+        if isinstance(error, requests.exceptions.HTTPError):
+            return error.response is not None and error.response.status_code >= 500
+        return isinstance(error, (requests.exceptions.ConnectionError,
+                                  requests.exceptions.Timeout,
+                                  requests.exceptions.RetryError))
     
     def _make_request(self, endpoint: str, params: Optional[Dict] = None) -> Optional[Dict]:
         """
@@ -39,16 +133,56 @@ class TMDBClient:
         if params is None:
             params = {}
         
-        params['api_key'] = self.api_key
+        # Key on the endpoint and query, never on the credentials
+        cache_key = f"{endpoint}?{urlencode(sorted(params.items()))}"
+        cached = self._response_cache.get(cache_key) if self._response_cache else None
+        if cached and time.time() - cached['fetched_at'] < self.RESPONSE_CACHE_MAX_AGE_SECONDS:
+            try:
+                return _json_loads(cached['body'])
+            except ValueError as e:
+                logger.warning(f"Ignoring unreadable cached TMDB response for {endpoint}: {e}")
+                cached = None
+        
+        headers = {}
+        if cached:
+            if cached['etag']:
+                headers['If-None-Match'] = cached['etag']
+            if cached['last_modified']:
+                headers['If-Modified-Since'] = cached['last_modified']
+        
+        if not self._use_bearer:
+            params['api_key'] = self.api_key
         url = f"{self.BASE_URL}{endpoint}"
         
         try:
-            response = requests.get(url, headers=self.headers, params=params, timeout=10)
+            response = self.session.get(url, params=params, headers=headers, timeout=10)
+            if cached and response.status_code == 304:
+                data = _json_loads(cached['body'])
+                self._response_cache.touch(cache_key)
+                return data
+            
             response.raise_for_status()
-            return response.json()
+            data = _json_loads(response.content)
+            # Only persist bodies that decoded
+            if self._response_cache:
+                self._response_cache.put(cache_key, response.content,
+                                         response.headers.get('ETag'), response.headers.get('Last-Modified'))
+            return data
         except requests.exceptions.RequestException as e:
+            if cached and self._is_transient_error(e):
+                try:
+                    data = _json_loads(cached['body'])
+                except ValueError:
+                    pass
+                else:
+                    logger.warning(f"TMDB API request failed for {endpoint}: {e}, using cached response")
+                    return data
             logger.error(f"TMDB API request failed for {endpoint}: {e}")
             return None
+        except ValueError as e:
+            # json.JSONDecodeError and orjson.JSONDecodeError are both ValueErrors
+            logger.error(f"Invalid JSON in TMDB response for {endpoint}: {e}")
+            return None
     
     def search_movie(self, movie_name: str) -> Optional[Dict]:
         """
@@ -60,6 +194,11 @@ class TMDBClient:
         Returns:
             Dictionary with 'title', 'year', 'id', 'original_title' or None if not found
         """
+        cache_key = ('movie', movie_name.strip().lower())
+        cached = self._cached(cache_key)
+        if cached is not _MISS:
+            return cached
+        
         logger.info(f"Searching for movie: {movie_name}")
         
         params = {
@@ -84,9 +223,13 @@ class TMDBClient:
             }
             
             logger.info(f"Found movie: {result['title']} ({result['year']}) [ID: {result['id']}]")
-            return result
+            self._cache.put(cache_key, result)
+            return dict(result)
         
         logger.warning(f"No movie found for: {movie_name}")
+        if data is not None:
+            # Only cache genuine misses, not request failures
+            self._cache.put(cache_key, None)
         return None
     
     def search_tv_show(self, tv_show_name: str) -> Optional[Dict]:
@@ -99,6 +242,11 @@ class TMDBClient:
         Returns:
             Dictionary with 'name', 'year', 'id', 'original_name' or None if not found
         """
+        cache_key = ('tv', tv_show_name.strip().lower())
+        cached = self._cached(cache_key)
+        if cached is not _MISS:
+            return cached
+        
         logger.info(f"Searching for TV show: {tv_show_name}")
         
         params = {
@@ -122,9 +270,13 @@ class TMDBClient:
             }
             
             logger.info(f"Found TV show: {result['name']} ({result['year']}) [ID: {result['id']}]")
-            return result
+            self._cache.put(cache_key, result)
+            return dict(result)
         
         logger.warning(f"No TV show found for: {tv_show_name}")
+        if data is not None:
+            # Only cache genuine misses, not request failures
+            self._cache.put(cache_key, None)
         return None
     
     def get_tv_season_info(self, show_id: int, season_number: int) -> Optional[Dict]:
@@ -138,6 +290,28 @@ class TMDBClient:
         Returns:
             Dictionary with season info and list of episodes or None on error
         """
+        season = self._get_season(show_id, season_number)
+        if season is None:
+            return None
+        
+        # Copy the episodes too so callers can't modify the cached season
+        result = {k: v for k, v in season.items() if not k.startswith('_')}
+        result['episodes'] = [dict(ep) for ep in season['episodes']]
+        return result
+    
+    def _get_season(self, show_id: int, season_number: int) -> Optional[Dict]:
+        """
+        Fetch a season, including its internal '_episodes_by_number' map.
+        
+        Returns:
+            The cached season dictionary (shared, must not be modified) or None on error
+        """
+        cache_key = ('season', show_id, season_number)
+        cached = self._cache.get(cache_key)
+        if cached is not _MISS:
+            logger.debug(f"TMDB cache hit: {cache_key}")
+            return cached
+        
         logger.info(f"Fetching season {season_number} info for show ID: {show_id}")
         
         endpoint = f'/tv/{show_id}/season/{season_number}'
@@ -162,10 +336,13 @@ class TMDBClient:
                 'name': data.get('name'),
                 'air_date': data.get('air_date', ''),
                 'episodes': episodes,
-                'episode_count': len(episodes)
+                'episode_count': len(episodes),
+                # Cached with the season so episode lookups don't rescan the list
+                '_episodes_by_number': {ep['episode_number']: ep for ep in episodes}
             }
             
             logger.info(f"Found {len(episodes)} episodes for season {season_number}")
+            self._cache.put(cache_key, result)
             return result
         
         logger.warning(f"No season info found for show ID {show_id}, season {season_number}")
@@ -189,17 +366,18 @@ class TMDBClient:
             return None
         
         # Then get season details
-        season_info = self.get_tv_season_info(show_info['id'], season_number)
+        season_info = self._get_season(show_info['id'], season_number)
         if not season_info:
             return None
         
         # If specific episode requested, filter to that episode
+        episodes = season_info['episodes']
         if episode_number is not None:
-            episodes = [ep for ep in season_info['episodes'] if ep['episode_number'] == episode_number]
-            if not episodes:
+            episode = season_info['_episodes_by_number'].get(episode_number)
+            if episode is None:
                 logger.warning(f"Episode {episode_number} not found in season {season_number}")
                 return None
-            season_info['episodes'] = episodes
+            episodes = [episode]
         
         # Combine show and season info
         result = {
@@ -207,14 +385,14 @@ class TMDBClient:
             'show_year': show_info['year'],
             'show_id': show_info['id'],
             'season_number': season_info['season_number'],
-            'episodes': season_info['episodes']
+            'episodes': [dict(ep) for ep in episodes]
         }
         
         return result
     
     def batch_search(self, queries: List[Dict[str, str]]) -> List[Dict]:
         """
-        Perform multiple searches in batch.
+        Perform multiple searches in batch, issuing the requests concurrently.
         
         Args:
             queries: List of query dictionaries with 'type' (movie/tv) and 'name' keys
@@ -222,24 +400,20 @@ class TMDBClient:
         Returns:
             List of results matching the query order
         """
-        results = []
-        
-        for query in queries:
-            query_type = query.get('type', 'movie').lower()
-            name = query.get('name', '')
-            
-            if not name:
-                results.append(None)
-                continue
+        with ThreadPoolExecutor(max_workers=self.BATCH_WORKERS) as executor:
+            futures = []
+            for query in queries:
+                query_type = query.get('type', 'movie').lower()
+                name = query.get('name', '')
+                
+                if not name:
+                    futures.append(None)
+                elif query_type == 'tv' or query_type == 'tv_show':
+                    futures.append(executor.submit(self.search_tv_show, name))
+                else:
+                    futures.append(executor.submit(self.search_movie, name))
             
-            if query_type == 'tv' or query_type == 'tv_show':
-                result = self.search_tv_show(name)
-            else:
-                result = self.search_movie(name)
-            
-            results.append(result)
-        
-        return results
+            return [future.result() if future is not None else None for future in futures]
 
 
 def format_tool_response(tmdb_result: Optional[Dict], query_type: str = 'movie') -> str:
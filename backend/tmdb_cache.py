@@ -0,0 +1,123 @@
+import sqlite3
+import time
+import logging
+from typing import Dict, Optional
+
+from backend.sqlite_store import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+
+class TMDBResponseCache(SQLiteStore):
+    """
+    Persistent SQLite cache of raw TMDB API responses.
+
+    Entries keep the response validators (ETag / Last-Modified) so stale entries can be
+    revalidated with a conditional GET instead of downloading the body again.
+    """
+
+    DESCRIPTION = 'TMDB cache'
+    # Responses older than this are deleted on startup. Past TMDBClient's max age they are
+    # still used for conditional revalidation and as an offline fallback, so keep them a while.
+    PRUNE_AFTER_SECONDS = 30 * 24 * 3600
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS responses (
+            cache_key TEXT PRIMARY KEY,
+            etag TEXT,
+            last_modified TEXT,
+            body BLOB NOT NULL,
+            fetched_at REAL NOT NULL
+        );
+    """
+
+    def __init__(self, db_path: str = 'tmdb_cache.db'):
+        super().__init__(db_path)
+
+    def _ensure_schema(self):
+        """Create the cache table and drop responses too old to be worth revalidating."""
+        super()._ensure_schema()
+        self.prune()
+
+    def get(self, cache_key: str) -> Optional[Dict]:
+        """
+        Get a cached response.
+
+        Returns:
+            Dictionary with 'etag', 'last_modified', 'body' (bytes) and 'fetched_at', or None
+        """
+        with self._lock:
+            try:
+                conn = self._connect()
+                try:
+                    row = conn.execute(
+                        'SELECT etag, last_modified, body, fetched_at FROM responses WHERE cache_key = ?',
+                        (cache_key,)
+                    ).fetchone()
+                finally:
+                    conn.close()
+            except sqlite3.Error as e:
+                logger.warning(f"Error reading TMDB cache: {e}")
+                return None
+
+        if row is None:
+            return None
+        etag, last_modified, body, fetched_at = row
+        return {'etag': etag, 'last_modified': last_modified, 'body': body, 'fetched_at': fetched_at}
+
+    def put(self, cache_key: str, body: bytes, etag: Optional[str], last_modified: Optional[str]):
+        """Store (or replace) a response body with its validators."""
+        with self._lock:
+            try:
+                conn = self._connect()
+                try:
+                    with conn:
+                        conn.execute(
+                            'INSERT OR REPLACE INTO responses (cache_key, etag, last_modified, body, fetched_at) '
+                            'VALUES (?, ?, ?, ?, ?)',
+                            (cache_key, etag, last_modified, body, time.time())
+                        )
+                finally:
+                    conn.close()
+            except sqlite3.Error as e:
+                logger.warning(f"Error writing TMDB cache: {e}")
+
+    def touch(self, cache_key: str):
+        """Mark a cached response as fresh again after a 304 Not Modified."""
+        with self._lock:
+            try:
+                conn = self._connect()
+                try:
+                    with conn:
+                        conn.execute('UPDATE responses SET fetched_at = ? WHERE cache_key = ?',
+                                     (time.time(), cache_key))
+                finally:
+                    conn.close()
+            except sqlite3.Error as e:
+                logger.warning(f"Error writing TMDB cache: {e}")
+
+    def prune(self, max_age_seconds: Optional[float] = None):
+        """
+        Delete responses fetched longer ago than max_age_seconds.
+
+        Args:
+            max_age_seconds: Age limit in seconds, defaults to PRUNE_AFTER_SECONDS
+        """
+        if max_age_seconds is None:
+            max_age_seconds = self.PRUNE_AFTER_SECONDS
+
+        with self._lock:
+            try:
+                conn = self._connect()
+                try:
+                    with conn:
+                        removed = conn.execute('DELETE FROM responses WHERE fetched_at < ?',
+                                               (time.time() - max_age_seconds,)).rowcount
+                finally:
+                    conn.close()
+            except sqlite3.Error as e:
+                logger.warning(f"Error pruning TMDB cache: {e}")
+                return
+
+        if removed:
+            logger.info(f"Pruned {removed} old responses from the TMDB cache")
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the library listing: parallel scan, rename patching and the persistent index.
+Every test works on its own temporary library tree.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from backend.library_browser import LibraryBrowser
+from backend.library_index import LibraryIndex
+
+
+def touch(path: str, content: bytes = b''):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(content)
+
+
+class LibraryTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.library = os.path.join(self.tmp, 'library')
+        self.index_path = os.path.join(self.tmp, 'library_index.db')
+        os.makedirs(self.library)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def browser(self, index_path=None) -> LibraryBrowser:
+        return LibraryBrowser(self.library, index_path)
+
+    def listed_paths(self, browser: LibraryBrowser):
+        return [f['full_path'] for f in browser._load_listing()[0]]
+
+    def make_non_utf8_file(self) -> str:
+        """Create sub/caf\\xe9.mkv with a Latin-1 name, or skip where the filesystem refuses it."""
+        if os.name != 'posix':
+            self.skipTest('bytes filenames are POSIX only')
+        sub = os.path.join(self.library, 'sub')
+        os.makedirs(sub, exist_ok=True)
+        name = os.path.join(os.fsencode(sub), b'caf\xe9.mkv')
+        try:
+            with open(name, 'wb') as f:
+                f.write(b'x')
+        except OSError:
+            self.skipTest('filesystem rejects non-UTF-8 names')
+        return os.fsdecode(name)
+
+
+class ScanTest(LibraryTestCase):
+    def test_parallel_scan_matches_walk(self):
+        # Deeper and wider than SCAN_WORKERS so directories are queued and completed out of order
+        for d in range(12):
+            for depth in range(3):
+                directory = os.path.join(self.library, f'd{d:02}', *[f'n{i}' for i in range(depth)])
+                touch(os.path.join(directory, f'movie{depth}.mkv'))
+                touch(os.path.join(directory, f'movie{depth}.srt'))
+                touch(os.path.join(directory, 'notes.txt'))
+
+        expected = set()
+        for root, _, filenames in os.walk(self.library):
+            expected.update(os.path.join(root, name) for name in filenames if not name.endswith('.txt'))
+
+        browser = self.browser()
+        listed = self.listed_paths(browser)
+        self.assertEqual(set(listed), expected)
+        self.assertEqual(len(listed), len(expected))
+
+        # Directories are joined in path order, so repeated scans list files in the same order
+        self.assertEqual(self.listed_paths(self.browser()), listed)
+        dirs = [os.path.dirname(path) for path in listed]
+        self.assertEqual(dirs, sorted(dirs))
+
+        video = os.path.join(self.library, 'd03', 'n0', 'movie1.mkv')
+        record = browser._cache_by_path[video]
+        self.assertEqual(record['subtitle_path'], os.path.join(self.library, 'd03', 'n0', 'movie1.srt'))
+
+    def test_non_utf8_filename_is_listed(self):
+        path = self.make_non_utf8_file()
+        touch(os.path.join(self.library, 'ok.mkv'))
+
+        result = self.browser(self.index_path).get_files_paginated(search='mkv')
+        self.assertEqual(result['pagination']['total_items'], 2)
+        self.assertEqual(result['stats']['total_files'], 2)
+        self.assertIn(path, [item['full_path'] for item in result['items']])
+
+        # The index round-trips the name, so a restart lists it from the index
+        restarted = self.browser(self.index_path)
+        self.assertIn(path, self.listed_paths(restarted))
+        stored = LibraryIndex(self.index_path).load(self.library)[os.path.dirname(path)][1]
+        self.assertIn(os.path.basename(path), [row[0] for row in stored])
+
+
+class RenameTest(LibraryTestCase):
+    def test_rename_patches_cached_listing(self):
+        video = os.path.join(self.library, 'Show', 'episode.mkv')
+        subtitle = os.path.join(self.library, 'Show', 'episode.srt')
+        touch(video, b'video')
+        touch(subtitle)
+        browser = self.browser()
+        browser._load_listing()
+
+        result = browser.rename_file(video, 'Renamed/new name.mkv')
+        self.assertTrue(result['success'])
+
+        new_video = os.path.join(self.library, 'Renamed', 'new name.mkv')
+        new_subtitle = os.path.join(self.library, 'Renamed', 'new name.srt')
+        # Served from the patched cache, without waiting for a rescan
+        self.assertEqual(sorted(self.listed_paths(browser)), sorted([new_subtitle, new_video]))
+        self.assertEqual(browser._cache_by_path[new_video]['subtitle_path'], new_subtitle)
+        self.assertEqual(browser._cache_by_path[new_video]['size'], 5)
+
+        # A full rescan agrees with the patched listing
+        browser._cache_time = 0.0
+        self.assertEqual(sorted(self.listed_paths(browser)), sorted([new_subtitle, new_video]))
+
+
+class IndexTest(LibraryTestCase):
+    def test_index_update_load_clear(self):
+        index = LibraryIndex(self.index_path)
+        records = [{'filename': 'a.mkv', 'extension': '.mkv', 'size': 3, 'modified': 1.5}]
+        sub = os.path.join(self.library, 'sub')
+        index.update(self.library, {self.library: (10, [], [sub]), sub: (20, records, [])}, [])
+
+        self.assertEqual(index.load(self.library), {
+            self.library: (10, [], [sub]),
+            sub: (20, [('a.mkv', '.mkv', 3, 1.5)], []),
+        })
+
+        index.update(self.library, {}, [sub])
+        self.assertEqual(list(index.load(self.library)), [self.library])
+
+        index.clear(self.library)
+        self.assertEqual(index.load(self.library), {})
+
+    def test_index_keeps_only_the_loaded_root(self):
+        index = LibraryIndex(self.index_path)
+        other = os.path.join(self.tmp, 'other')
+        index.update(other, {other: (1, [], [])}, [])
+        index.update(self.library, {self.library: (1, [], [])}, [])
+
+        index.load(self.library)
+        self.assertEqual(index.load(other), {})
+
+    def test_restart_serves_index_then_verifies_in_background(self):
+        video = os.path.join(self.library, 'Movies', 'movie.mkv')
+        touch(video, b'x')
+        self.assertEqual(self.browser(self.index_path)._load_listing()[0][0]['size'], 1)
+
+        # Grow the file in place: its directory's mtime doesn't change
+        movies_mtime = os.stat(os.path.dirname(video)).st_mtime_ns
+        with open(video, 'ab') as f:
+            f.write(b'more')
+        self.assertEqual(os.stat(os.path.dirname(video)).st_mtime_ns, movies_mtime)
+
+        restarted = self.browser(self.index_path)
+        restarted._load_listing()
+        self.assertIsNotNone(restarted._verify_thread)
+        restarted._verify_thread.join(timeout=10)
+
+        listing, columns = restarted._load_listing()
+        self.assertEqual(listing[0]['size'], 5)
+        self.assertEqual(restarted._get_library_stats(columns)['total_size'], 5)
+
+        # The verified size was written back to the index
+        stored = LibraryIndex(self.index_path).load(self.library)[os.path.dirname(video)][1]
+        self.assertEqual(stored[0][2], 5)
+
+    def test_invalidate_cache_clears_index(self):
+        touch(os.path.join(self.library, 'a.mkv'))
+        browser = self.browser(self.index_path)
+        browser._load_listing()
+        self.assertTrue(LibraryIndex(self.index_path).load(self.library))
+
+        browser.invalidate_cache()
+        self.assertEqual(LibraryIndex(self.index_path).load(self.library), {})
+        self.assertEqual(len(browser._load_listing()[0]), 1)
+
+    def test_failed_index_write_keeps_the_scan(self):
+        touch(os.path.join(self.library, 'a.mkv'))
+        browser = self.browser(self.index_path)
+
+        def fail(*args, **kwargs):
+            raise RuntimeError('disk full')
+        browser._index.update = fail
+
+        self.assertEqual(len(browser._load_listing()[0]), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
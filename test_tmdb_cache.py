@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the TMDB response cache.
+Requests go to a stubbed session.get, so no API key or network access is needed.
+"""
+
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+
+import requests
+
+from backend.tmdb_api import TMDBClient
+from backend.tmdb_cache import TMDBResponseCache
+
+
+def make_response(status_code: int, body: bytes = b'', headers=None) -> requests.Response:
+    """Build a requests.Response as the session would return it."""
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = body
+    response.headers.update(headers or {})
+    response.url = 'https://api.themoviedb.org/3/test'
+    response.reason = 'Test'
+    return response
+
+
+class StubGet:
+    """Stand-in for session.get that replays scripted responses or exceptions."""
+
+    def __init__(self):
+        self.script = []
+        self.calls = []
+
+    def __call__(self, url, params=None, headers=None, timeout=None):
+        self.calls.append({'url': url, 'params': params, 'headers': headers or {}})
+        result = self.script.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+class TMDBResponseCacheTest(unittest.TestCase):
+    ENDPOINT = '/search/movie'
+    CACHE_KEY = '/search/movie?query=Inception'
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.tmp.name, 'tmdb_cache.db')
+        self.client = TMDBClient('test-key', cache_path=self.cache_path)
+        self.get = StubGet()
+        self.client.session.get = self.get
+
+    def tearDown(self):
+        self.client.session.close()
+        self.tmp.cleanup()
+
+    def request(self):
+        return self.client._make_request(self.ENDPOINT, {'query': 'Inception'})
+
+    def expire(self, age_seconds=None):
+        """Age the cached entry past RESPONSE_CACHE_MAX_AGE_SECONDS (or by age_seconds)."""
+        if age_seconds is None:
+            age_seconds = TMDBClient.RESPONSE_CACHE_MAX_AGE_SECONDS + 60
+        conn = sqlite3.connect(self.cache_path)
+        with conn:
+            conn.execute('UPDATE responses SET fetched_at = ?', (time.time() - age_seconds,))
+        conn.close()
+
+    def store(self, body=b'{"results": [1]}', etag='"v1"'):
+        self.get.script.append(make_response(200, body, {'ETag': etag}))
+        return self.request()
+
+    def test_fresh_hit_skips_the_network(self):
+        self.assertEqual(self.store(), {'results': [1]})
+        self.assertEqual(self.request(), {'results': [1]})
+        self.assertEqual(len(self.get.calls), 1)
+        # Keyed on the endpoint and query only, without the api_key param
+        self.assertIsNotNone(self.client._response_cache.get(self.CACHE_KEY))
+
+    def test_undecodable_response_is_not_cached(self):
+        self.get.script.append(make_response(200, b'not json'))
+        self.assertIsNone(self.request())
+        self.assertIsNone(self.client._response_cache.get(self.CACHE_KEY))
+
+    def test_304_revalidates_and_touches(self):
+        self.store()
+        self.expire()
+        stale_fetched_at = self.client._response_cache.get(self.CACHE_KEY)['fetched_at']
+
+        self.get.script.append(make_response(304))
+        self.assertEqual(self.request(), {'results': [1]})
+        self.assertEqual(self.get.calls[-1]['headers'].get('If-None-Match'), '"v1"')
+        self.assertGreater(self.client._response_cache.get(self.CACHE_KEY)['fetched_at'], stale_fetched_at)
+
+        # Fresh again, so the next lookup doesn't go to the network
+        self.assertEqual(self.request(), {'results': [1]})
+        self.assertEqual(len(self.get.calls), 2)
+
+    def test_stale_fallback_on_transient_errors(self):
+        self.store()
+        self.expire()
+        for failure in (make_response(503), make_response(500),
+                        requests.exceptions.ConnectionError('offline'),
+                        requests.exceptions.Timeout('slow'),
+                        requests.exceptions.RetryError('retries exhausted')):
+            with self.subTest(failure=failure):
+                self.get.script.append(failure)
+                self.assertEqual(self.request(), {'results': [1]})
+
+    def test_no_stale_fallback_on_client_errors(self):
+        self.store()
+        self.expire()
+        for status_code in (401, 404):
+            with self.subTest(status_code=status_code):
+                self.get.script.append(make_response(status_code))
+                self.assertIsNone(self.request())
+
+    def test_undecodable_fresh_entry_is_refetched(self):
+        self.client._response_cache.put(self.CACHE_KEY, b'garbage', None, None)
+        self.get.script.append(make_response(200, b'{"results": [2]}'))
+        self.assertEqual(self.request(), {'results': [2]})
+        self.assertEqual(self.client._response_cache.get(self.CACHE_KEY)['body'], b'{"results": [2]}')
+
+    def test_undecodable_stale_entry(self):
+        self.client._response_cache.put(self.CACHE_KEY, b'garbage', '"v1"', None)
+        self.expire()
+        self.get.script.append(make_response(304))
+        self.assertIsNone(self.request())
+        self.get.script.append(requests.exceptions.ConnectionError('offline'))
+        self.assertIsNone(self.request())
+
+    def test_prune_on_open(self):
+        cache = self.client._response_cache
+        cache.put('old', b'{}', None, None)
+        cache.put('recent', b'{}', None, None)
+        conn = sqlite3.connect(self.cache_path)
+        with conn:
+            conn.execute("UPDATE responses SET fetched_at = ? WHERE cache_key = 'old'",
+                         (time.time() - TMDBResponseCache.PRUNE_AFTER_SECONDS - 60,))
+        conn.close()
+
+        reopened = TMDBResponseCache(self.cache_path)
+        self.assertIsNone(reopened.get('old'))
+        self.assertIsNotNone(reopened.get('recent'))
+
+
+if __name__ == '__main__':
+    unittest.main()